@@ -2,6 +2,7 @@
 from fastapi import FastAPI, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
 import os, httpx
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +10,23 @@ OPTIMIZER_URL = os.getenv("OPTIMIZER_URL", "http://127.0.0.1:8001")
 
 app = FastAPI(title="CleanLink API Gateway")
 
+# Optimizer 호출용 공용 클라이언트 (커넥션 풀 재사용)
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+async def get_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=20,
+        )
+    return _CLIENT
+
+@app.on_event("shutdown")
+async def shutdown():
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+
 # CORS (개발용: 전체 허용 → 배포 시 도메인 제한 권장)
 app.add_middleware(
     CORSMiddleware,
@@ -27,9 +45,9 @@ async def api_optimize(payload: dict = Body(..., description="OptimizeRequest JS
     """프런트에서 보낸 JSON을 Optimizer로 프록시 전달"""
     url = f"{OPTIMIZER_URL}/optimize"
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.post(url, json=payload)
-            r.raise_for_status()
-            return r.json()
+        client = await get_client()
+        r = await client.post(url, json=payload)
+        r.raise_for_status()
+        return r.json()
     except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"optimizer error: {e}")
@@ -0,0 +1,28 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+# cleanlink/services/optimizer/_haversine.pyx
+# numba가 없는 배포용 하버사인 행렬 C 확장 (빌드: optimizer/Dockerfile 참고)
+from libc.math cimport sin, cos, asin, sqrt
+import numpy as np
+
+cdef double EARTH_RADIUS_M = 6371000.0
+
+cdef inline double _hav(double lat1, double lon1, double lat2, double lon2) noexcept nogil:
+    """하버사인 거리(m) 스칼라 커널 (입력은 라디안)"""
+    cdef double h = sin((lat2 - lat1)/2)**2 + cos(lat1)*cos(lat2)*sin((lon2 - lon1)/2)**2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(h))
+
+cpdef haversine_matrix(const double[::1] lat, const double[::1] lon):
+    """라디안 위도/경도 배열 → 거리(m) int64 행렬. GIL 없이 단일 스레드로 계산"""
+    cdef Py_ssize_t n = lat.shape[0]
+    cdef Py_ssize_t i, j
+    cdef long long d
+    out = np.zeros((n, n), dtype=np.int64)
+    cdef long long[:, ::1] o = out
+    # 실사용 크기(N≈수십)에선 OpenMP 스레드 기동 비용이 계산보다 커서 prange를 쓰지 않는다
+    with nogil:
+        for i in range(n):
+            for j in range(i + 1, n):
+                d = <long long>_hav(lat[i], lon[i], lat[j], lon[j])
+                o[i, j] = d
+                o[j, i] = d
+    return out
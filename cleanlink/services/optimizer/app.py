@@ -1,12 +1,16 @@
 # cleanlink/services/optimizer/app.py
 from fastapi import FastAPI
 from pydantic import BaseModel, Field
-from typing import List, Optional, Tuple
-from math import radians, sin, cos, asin, sqrt
+from typing import List, Optional
 from datetime import datetime, timedelta
-from ortools.constraint_solver import routing_enums_pb2, pywrapcp
-from cleanlink.services.optimizer.directions import distance_time, haversine_m
-import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from cachetools import TTLCache
+from cleanlink.services.optimizer.directions import (
+    NAVER_USE, close_client, distance_time, haversine_matrix_m, walk_min_matrix, warm_up,
+)
+from cleanlink.services.optimizer.solver import solve_route
+import asyncio, multiprocessing, os
+import numpy as np
 
 class Vehicle(BaseModel):
     id: int
@@ -33,107 +37,122 @@ class OptimizeRequest(BaseModel):
     vehicles: List[Vehicle]
     jobs: List[Job]
 
-def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-    lat1, lon1 = a; lat2, lon2 = b
-    R = 6371.0
-    dlat = radians(lat2 - lat1); dlon = radians(lon2 - lon1)
-    lat1 = radians(lat1); lat2 = radians(lat2)
-    h = sin(dlat/2)**2 + cos(lat1)*cos(lat2)*sin(dlon/2)**2
-    return 2 * R * asin(sqrt(h))
-
 app = FastAPI(title="CleanLink Optimizer")
 
+# OR-Tools 탐색 전용 프로세스 풀 (요청 간 공유, startup에서 생성 → shutdown에서 종료).
+# spawn: 부모의 numba/OpenMP 스레드를 fork로 물려받으면 종료 시 멈추므로 새 프로세스로 시작
+_POOL: Optional[ProcessPoolExecutor] = None
+
+# 동일 요청(좌표 소수 5자리 양자화) 결과 캐시 (폴링/재시도 대응, 5분)
+_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=300)
+
+@app.on_event("startup")
+async def startup():
+    global _POOL
+    warm_up()
+    _POOL = ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    # 워커 기동 + OR-Tools import 비용을 첫 요청 전에 미리 치름
+    await asyncio.get_running_loop().run_in_executor(_POOL, solve_route, [[0, 1], [1, 0]], 1)
+
+@app.on_event("shutdown")
+async def shutdown():
+    global _POOL
+    await close_client()
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
 @app.get("/healthz")
 def healthz():
     return {"ok": True}
 
 @app.post("/optimize")
-def optimize(req: OptimizeRequest):
+async def optimize(req: OptimizeRequest):
     assert req.vehicles, "at least one vehicle required"
 
     # 입력 정리
     v = req.vehicles[0]  # MVP: 차량 1대
-    depot = (v.depot_lat, v.depot_lng)
-    points = [depot] + [(j.lat, j.lng) for j in req.jobs]
-    n = len(points)
+    cache_key = (
+        req.date, v.id, round(v.depot_lat, 5), round(v.depot_lng, 5),
+        tuple(sorted((j.id, round(j.lat, 5), round(j.lng, 5), j.service_min) for j in req.jobs)),
+    )
+    cached = _CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # 위도/경도를 각각 연속 배열로 보관 (0번은 depot)
+    lats = np.fromiter((v.depot_lat, *(j.lat for j in req.jobs)), dtype=np.float64)
+    lngs = np.fromiter((v.depot_lng, *(j.lng for j in req.jobs)), dtype=np.float64)
+    n = len(lats)
 
     # --- 거리/시간 행렬 생성 (네이버 사용 가능 시 네이버, 아니면 폴백) ---
-    dist_m = [[0] * n for _ in range(n)]        # meters
-    walk_min_mat = [[0] * n for _ in range(n)]  # minutes (ETA 계산용)
-
-    async def fill(i, j):
-        if i == j:
-            return
-        d, mins = await distance_time(points[i], points[j])
-        dist_m[i][j] = d
-        walk_min_mat[i][j] = mins
-
-    async def build_matrix():
-        sem = asyncio.Semaphore(8)  # 동시 호출 제한
-        async def wrapped(i, j):
+    if NAVER_USE:
+        dist_arr = np.zeros((n, n), dtype=np.int64)      # meters
+        walk_min_arr = np.zeros((n, n), dtype=np.int32)  # minutes (ETA 계산용)
+        # 네이버 실패 쌍용 하버사인 폴백을 미리 한 번에 계산 (라디안 변환은 지점당 1회)
+        fallback_m = haversine_matrix_m(lats, lngs).tolist()
+
+        # 동시 호출 제한 (HTTP/2는 한 커넥션에 모든 요청을 싣기 때문에 풀 한도로는 막히지 않음)
+        sem = asyncio.Semaphore(50)
+        fell_back = False  # 한 쌍이라도 하버사인으로 폴백했으면 결과를 캐시하지 않음
+
+        # 대칭으로 간주: i<j 쌍만 조회하고 (j, i)에 복사 → 외부 API 호출 수 절반
+        async def fill(i, j):
+            nonlocal fell_back
             async with sem:
-                await fill(i, j)
+                d, mins, pair_fell_back = await distance_time(
+                    (lats[i], lngs[i]), (lats[j], lngs[j]), fallback_m[i][j])
+            fell_back = fell_back or pair_fell_back
+            dist_arr[i, j] = dist_arr[j, i] = d
+            walk_min_arr[i, j] = walk_min_arr[j, i] = mins
+
         await asyncio.gather(*(
-            wrapped(i, j)
-            for i in range(n) for j in range(n) if i != j
+            fill(i, j)
+            for i in range(n) for j in range(i + 1, n)
         ))
-
-    asyncio.run(build_matrix())
-
-    # --- OR-Tools TSP ---
-    manager = pywrapcp.RoutingIndexManager(n, 1, 0)  # 1 vehicle, depot=0
-    routing = pywrapcp.RoutingModel(manager)
-
-    def distance_cb(from_index, to_index):
-        i = manager.IndexToNode(from_index)
-        j = manager.IndexToNode(to_index)
-        return dist_m[i][j]
-
-    cb_idx = routing.RegisterTransitCallback(distance_cb)
-    routing.SetArcCostEvaluatorOfAllVehicles(cb_idx)
-
-    params = pywrapcp.DefaultRoutingSearchParameters()
-    params.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-    params.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-    params.time_limit.FromSeconds(3)
-
-    solution = routing.SolveWithParameters(params)
-    route_order = []
-    if solution:
-        idx = routing.Start(0)
-        while not routing.IsEnd(idx):
-            node = manager.IndexToNode(idx)
-            if node != 0:
-                route_order.append(node)  # 1..N (jobs index + 1)
-            idx = solution.Value(routing.NextVar(idx))
     else:
-        route_order = list(range(1, n))
+        fell_back = False
+        # 폴백: 하버사인 행렬을 벡터 연산으로 한 번에 계산
+        dist_arr = haversine_matrix_m(lats, lngs)
+        walk_min_arr = walk_min_matrix(dist_arr)
+
+    # OR-Tools 전이 행렬/ETA 계산은 파이썬 int 리스트를 쓰므로 여기서 한 번만 변환
+    dist_m = dist_arr.tolist()
+    walk_min_mat = walk_min_arr.tolist()
+
+    # --- OR-Tools TSP (CPU 바운드 → 프로세스 풀에서 실행해 워커를 막지 않음) ---
+    if n <= 2:
+        route_order = list(range(1, n))  # 작업 0~1개: 경로가 자명하므로 솔버 생략
+    else:
+        loop = asyncio.get_running_loop()
+        route_order = await loop.run_in_executor(_POOL, solve_route, dist_m, 3)
 
     # --- ETA/요약 계산 ---
-    current_ts = datetime.strptime(req.date + " 09:00", "%Y-%m-%d %H:%M")
+    base_ts = datetime.strptime(req.date + " 09:00", "%Y-%m-%d %H:%M")
     route_id = 9001
     seq = 1
     prev = 0
     km_total = 0.0
-    min_total = 0
+    min_total = 0  # 누적 분 (ETA = base_ts + min_total)
     route_stops = []
 
     for node in route_order:
         d_m = dist_m[prev][node]
         walk_min = walk_min_mat[prev][node]
-        current_ts += timedelta(minutes=walk_min)
-
         job = req.jobs[node - 1]
-        current_ts += timedelta(minutes=job.service_min)
 
         km_total += d_m / 1000.0
         min_total += walk_min + job.service_min
+        eta_ts = base_ts + timedelta(minutes=min_total)
 
         route_stops.append({
             "route_id": route_id,
             "seq": seq,
             "job_id": job.id,
-            "eta_ts": current_ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "eta_ts": eta_ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
             "etc_min": job.service_min,
             "dump_visit": False
         })
@@ -148,4 +167,7 @@ def optimize(req: OptimizeRequest):
         "score": round(1.0 / (1.0 + km_total), 2)
     }]
 
-    return {"routes": routes, "route_stops": route_stops}
+    result = {"routes": routes, "route_stops": route_stops}
+    if not fell_back:  # 일시적 네이버 실패로 나빠진 경로를 TTL 동안 고정하지 않도록
+        _CACHE[cache_key] = result
+    return result
@@ -1,17 +1,42 @@
 # cleanlink/services/optimizer/directions.py
 from __future__ import annotations
 import os, asyncio
+from collections import OrderedDict
 from math import radians, sin, cos, asin, sqrt
-from typing import Tuple
+from typing import Optional, Tuple
 import httpx
+import numpy as np
+import orjson
 from dotenv import load_dotenv
 
+try:
+    from numba import njit
+except ImportError:  # numba 미설치 환경 → NumPy 경로로 폴백
+    njit = None
+
+try:  # Cython 확장 (optimizer/Dockerfile에서 빌드)
+    from cleanlink.services.optimizer._haversine import haversine_matrix as _haversine_matrix_c
+except ImportError:  # 미빌드 환경 → numba/NumPy 경로로 폴백
+    _haversine_matrix_c = None
+
 load_dotenv()
 
 NAVER_CLIENT_ID = os.getenv("NAVER_CLIENT_ID")
 NAVER_CLIENT_SECRET = os.getenv("NAVER_CLIENT_SECRET")
 NAVER_USE = os.getenv("NAVER_USE", "false").lower() == "true" and NAVER_CLIENT_ID and NAVER_CLIENT_SECRET
 
+EARTH_RADIUS_M = 6371000.0
+WALKING_MPM = 4500/60.0  # 보행 4.5km/h (m/min)
+
+# 네이버 조회 결과 LRU 캐시 (좌표 소수 5자리 ≈ 1m 단위로 양자화한 키)
+NAVER_CACHE_SIZE = 100_000
+NAVER_CACHE_PRECISION = 5
+_naver_cache: "OrderedDict[Tuple[float, float, float, float], Tuple[int, int]]" = OrderedDict()
+
+# 프로세스 공용 HTTP 클라이언트 (커넥션 풀 재사용 → 호출마다 TCP/TLS 핸드셰이크 생략)
+_CLIENT: Optional[httpx.AsyncClient] = None
+_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
 def haversine_m(a: Tuple[float, float], b: Tuple[float, float]) -> int:
     lat1, lon1 = a; lat2, lon2 = b
     R = 6371.0
@@ -20,6 +45,83 @@ def haversine_m(a: Tuple[float, float], b: Tuple[float, float]) -> int:
     h = sin(dlat/2)**2 + cos(lat1)*cos(lat2)*sin(dlon/2)**2
     return int(2 * R * asin(sqrt(h)) * 1000)
 
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _haversine_m_nb(lat1, lon1, lat2, lon2):
+        """하버사인 거리(m) 스칼라 커널 (입력은 라디안)"""
+        h = np.sin((lat2 - lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((lon2 - lon1)/2)**2
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(h))
+
+    # 실사용 크기(N≈수십)에서는 parallel=True의 스레드 기동 비용이 계산보다 커서 단일 스레드로 둔다
+    @njit(cache=True)
+    def _haversine_matrix_nb(lat, lon):
+        """거리(m) 행렬을 채움. 대칭이므로 i<j만 계산해 복사"""
+        n = lat.shape[0]
+        out = np.zeros((n, n), dtype=np.int64)
+        for i in range(n):
+            for j in range(i + 1, n):
+                d = np.int64(_haversine_m_nb(lat[i], lon[i], lat[j], lon[j]))
+                out[i, j] = d
+                out[j, i] = d
+        return out
+
+def haversine_matrix_m(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """
+    모든 지점 쌍의 하버사인 거리(m) 행렬을 계산 (C 확장 → numba JIT → NumPy 순으로 사용).
+    위도/경도는 각각 연속된 float64 배열로 받는다 (SoA).
+    거리는 대칭이므로 상삼각(i<j) 쌍만 계산한 뒤 하삼각에 복사한다.
+    """
+    n = len(lats)
+    lat = np.radians(lats); lon = np.radians(lngs)
+    if _haversine_matrix_c is not None:
+        return _haversine_matrix_c(lat, lon)
+    if njit is not None:
+        return _haversine_matrix_nb(lat, lon)
+    # NumPy 경로는 float32로 계산 (메모리 대역폭 절반, m 단위 정수 결과엔 충분).
+    # 단, 좌표 차는 float64에서 구한 뒤 변환해 가까운 지점 간 자릿수 손실을 막는다.
+    iu, ju = np.triu_indices(n, k=1)
+    dlat = (lat[ju] - lat[iu]).astype(np.float32)
+    dlon = (lon[ju] - lon[iu]).astype(np.float32)
+    cos_lat = np.cos(lat).astype(np.float32)
+    h = np.sin(dlat/2)**2 + cos_lat[iu]*cos_lat[ju]*np.sin(dlon/2)**2
+    d = (np.float32(2 * EARTH_RADIUS_M) * np.arcsin(np.sqrt(h))).astype(np.int32)
+    out = np.zeros((n, n), dtype=np.int32)
+    out[iu, ju] = d
+    out[ju, iu] = d
+    return out
+
+def warm_up() -> None:
+    """JIT 커널을 미리 컴파일/로드 (첫 요청에서 컴파일 지연이 생기지 않도록 기동 시 호출)"""
+    haversine_matrix_m(np.zeros(2), np.zeros(2))
+
+def walk_min_matrix(dist_m: np.ndarray) -> np.ndarray:
+    """거리 행렬(m) → 보행 시간 행렬(min). 대각(자기 자신)은 0"""
+    mins = np.maximum(1, (dist_m / WALKING_MPM).astype(np.int64))
+    np.fill_diagonal(mins, 0)
+    return mins
+
+async def get_client() -> httpx.AsyncClient:
+    """공용 AsyncClient를 지연 생성. 커넥션은 이벤트 루프에 묶이므로 루프가 바뀌면 새로 만든다"""
+    global _CLIENT, _CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    if _CLIENT is None or _CLIENT.is_closed or _CLIENT_LOOP is not loop:
+        _CLIENT = httpx.AsyncClient(
+            http2=True,  # 한 커넥션에서 여러 요청을 스트림 다중화
+            # HTTP/2에선 풀 한도가 커넥션 수만 제한하고 동시 스트림 수는 막지 못함
+            # → 동시 호출 제한은 호출부(optimize)의 세마포어가 담당
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=10,
+        )
+        _CLIENT_LOOP = loop
+    return _CLIENT
+
+async def close_client() -> None:
+    global _CLIENT, _CLIENT_LOOP
+    if _CLIENT is not None and _CLIENT_LOOP is asyncio.get_running_loop():
+        await _CLIENT.aclose()
+    _CLIENT = None
+    _CLIENT_LOOP = None
+
 async def naver_distance_time(a: Tuple[float, float], b: Tuple[float, float]) -> Tuple[int, int]:
     """
     네이버 도로거리/시간 조회 (가능하면 사용, 실패 시 예외 → 호출부에서 폴백).
@@ -35,25 +137,45 @@ async def naver_distance_time(a: Tuple[float, float], b: Tuple[float, float]) ->
     start = f"{a[1]},{a[0]}"
     goal  = f"{b[1]},{b[0]}"
     url = f"https://naveropenapi.apigw.ntruss.com/map-direction/v1/driving?start={start}&goal={goal}&option=trafast"
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(url, headers=headers)
-        r.raise_for_status()
-        data = r.json()
-        # 요약값 파싱 (없으면 KeyError → except에서 폴백)
-        s = data["route"]["trafast"][0]["summary"]
-        distance_m = int(s["distance"])         # meters
-        duration_ms = int(s["duration"])        # ms
-        duration_min = max(1, duration_ms // 60000)
-        return distance_m, duration_min
-
-async def distance_time(a: Tuple[float, float], b: Tuple[float, float]) -> Tuple[int, int]:
-    """네이버 사용 가능하면 네이버, 아니면 하버사인(보행 속도 환산)"""
+    client = await get_client()
+    r = await client.get(url, headers=headers)
+    r.raise_for_status()
+    data = orjson.loads(r.content)  # stdlib json보다 빠른 디코딩
+    # 요약값 파싱 (없으면 KeyError → except에서 폴백)
+    s = data["route"]["trafast"][0]["summary"]
+    distance_m = int(s["distance"])         # meters
+    duration_ms = int(s["duration"])        # ms
+    duration_min = max(1, duration_ms // 60000)
+    return distance_m, duration_min
+
+async def cached_naver_distance_time(a: Tuple[float, float], b: Tuple[float, float]) -> Tuple[int, int]:
+    """양자화된 좌표 기준으로 네이버 결과를 캐시 (실패는 캐시하지 않음)"""
+    # 모든 조회는 서버 이벤트 루프 한 곳에서 실행되고 캐시 접근 중엔 await가 없으므로 락 불필요
+    key = tuple(round(x, NAVER_CACHE_PRECISION) for x in (*a, *b))
+    hit = _naver_cache.get(key)
+    if hit is not None:
+        _naver_cache.move_to_end(key)
+        return hit
+    result = await naver_distance_time(key[:2], key[2:])
+    _naver_cache[key] = result
+    if len(_naver_cache) > NAVER_CACHE_SIZE:
+        _naver_cache.popitem(last=False)
+    return result
+
+async def distance_time(a: Tuple[float, float], b: Tuple[float, float],
+                        fallback_m: Optional[int] = None) -> Tuple[int, int, bool]:
+    """
+    네이버 사용 가능하면 네이버, 아니면 하버사인(보행 속도 환산).
+    fallback_m: 미리 계산해 둔 하버사인 거리(m). 주면 쌍마다 다시 계산하지 않음.
+    반환: (거리 m, 시간 min, 네이버 조회 실패로 하버사인 폴백했는지 여부)
+    """
+    fell_back = False
     if NAVER_USE:
         try:
-            return await naver_distance_time(a, b)
+            d_m, mins = await cached_naver_distance_time(a, b)
+            return d_m, mins, False
         except Exception:
-            pass  # 폴백
+            fell_back = True  # 폴백
     # 폴백: 하버사인 + 보행 4.5km/h
-    d_m = haversine_m(a, b)
-    walking_mpm = 4500/60.0
-    return d_m, max(1, int(d_m / walking_mpm))
+    d_m = haversine_m(a, b) if fallback_m is None else fallback_m
+    return d_m, max(1, int(d_m / WALKING_MPM)), fell_back
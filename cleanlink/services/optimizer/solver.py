@@ -0,0 +1,43 @@
+# cleanlink/services/optimizer/solver.py
+from typing import List
+from ortools.constraint_solver import routing_enums_pb2, pywrapcp
+
+SMALL_N = 8  # 이 이하(depot 포함)는 짧은 시간/해 개수 제한으로 조기 종료
+
+def solve_route(dist_m: List[List[int]], time_limit_s: int = 3) -> List[int]:
+    """
+    거리 행렬(m)로 단일 차량 TSP를 풀어 방문 순서(1..N, depot=0 제외)를 반환.
+    프로세스 풀에서 실행되므로 최상위 함수 + 피클 가능한 인자만 사용.
+    """
+    n = len(dist_m)
+    manager = pywrapcp.RoutingIndexManager(n, 1, 0)  # 1 vehicle, depot=0
+    routing = pywrapcp.RoutingModel(manager)
+
+    # 행렬을 통째로 넘겨 C++ 내부에서 아크 비용 평가 (파이썬 콜백 왕복 제거)
+    cb_idx = routing.RegisterTransitMatrix(dist_m)
+    routing.SetArcCostEvaluatorOfAllVehicles(cb_idx)
+
+    params = pywrapcp.DefaultRoutingSearchParameters()
+    # 초기해 품질이 좋은 삽입 휴리스틱 + 타부 탐색 (초기해 복구보다 개선에 시간 사용)
+    params.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION
+    params.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GENERIC_TABU_SEARCH
+    params.log_search = False
+    params.use_full_propagation = False  # 단순 TSP라 경량 전파로 충분
+    if n <= SMALL_N:
+        params.time_limit.FromMilliseconds(200)
+        params.solution_limit = 50
+        params.lns_time_limit.FromMilliseconds(50)
+    else:
+        params.time_limit.FromSeconds(time_limit_s)
+
+    solution = routing.SolveWithParameters(params)
+    if not solution:
+        return list(range(1, n))
+    route_order = []
+    idx = routing.Start(0)
+    while not routing.IsEnd(idx):
+        node = manager.IndexToNode(idx)
+        if node != 0:
+            route_order.append(node)  # 1..N (jobs index + 1)
+        idx = solution.Value(routing.NextVar(idx))
+    return route_order